@@ -1,12 +1,38 @@
 # backend/api/anomalies.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
+from backend.cache import cached
 from backend.db import get_db   # ✅ FIXED
 
-router = APIRouter()
+router = APIRouter(prefix="/kpi")
+
+# -------------------------------------------------
+# SQL statements (built once at import, reused per request)
+# -------------------------------------------------
+# Stats and filtering happen in Postgres over the trigger-maintained
+# ecom.daily_revenue table; only the anomalous days (plus one row carrying
+# the stats) come back.
+_SQL_REVENUE_ANOMALIES = text("""
+    WITH stats AS (
+        SELECT
+            AVG(revenue) AS mean_revenue,
+            STDDEV_POP(revenue) AS std_dev
+        FROM ecom.daily_revenue
+    )
+    SELECT
+        d.day,
+        d.revenue::double precision AS revenue,
+        ((d.revenue - s.mean_revenue) / NULLIF(s.std_dev, 0))::double precision AS z_score,
+        s.mean_revenue::double precision AS mean_revenue,
+        s.std_dev::double precision AS std_dev
+    FROM stats s
+    LEFT JOIN ecom.daily_revenue d
+      ON ABS((d.revenue - s.mean_revenue) / NULLIF(s.std_dev, 0)) >= :threshold
+    ORDER BY d.day;
+""")
 
 # -------------------------------------------------
 # Health check (used to verify router loading)
@@ -19,6 +45,7 @@ async def anomalies_health():
 # Revenue anomaly detection (simple z-score logic)
 # -------------------------------------------------
 @router.get("/anomalies/revenue")
+@cached("anomalies:revenue", ttl=60)
 async def revenue_anomalies(
     threshold: float = 2.0,
     db: AsyncSession = Depends(get_db),   # ✅ FIXED
@@ -27,48 +54,27 @@ async def revenue_anomalies(
     Detect revenue anomalies using simple z-score method.
     Returns days where revenue deviates significantly from mean.
     """
-    try:
-        sql = text("""
-            SELECT
-                date_trunc('day', o.order_date::timestamp)::date AS day,
-                SUM(oi.quantity * oi.unit_price) AS revenue
-            FROM ecom.orders o
-            JOIN ecom.order_items oi ON oi.order_id = o.order_id
-            WHERE o.status = 'completed'
-            GROUP BY 1
-            ORDER BY 1;
-        """)
-
-        res = await db.execute(sql)
-        rows = res.fetchall()
-
-        if not rows:
-            return {"anomalies": [], "message": "No data available"}
-
-        # Compute mean and std in Python
-        revenues = [float(r[1] or 0) for r in rows]
-        mean = sum(revenues) / len(revenues)
-
-        variance = sum((x - mean) ** 2 for x in revenues) / len(revenues)
-        std = variance ** 0.5
+    res = await db.execute(_SQL_REVENUE_ANOMALIES, {"threshold": threshold})
 
-        anomalies = []
-        for (day, revenue), value in zip(rows, revenues):
-            if std > 0:
-                z = (value - mean) / std
-                if abs(z) >= threshold:
-                    anomalies.append({
-                        "date": str(day),
-                        "revenue": value,
-                        "z_score": round(z, 2)
-                    })
+    # Single pass over the result; the stats columns repeat on every row
+    # (stats always yields exactly one row even when nothing qualifies).
+    mean = std = None
+    anomalies = []
+    for day, revenue, z, mean, std in res:
+        if day is not None:
+            anomalies.append({
+                "date": day,
+                "revenue": revenue,
+                "z_score": z,
+            })
 
-        return {
-            "mean_revenue": round(mean, 2),
-            "std_dev": round(std, 2),
-            "threshold": threshold,
-            "anomalies": anomalies
-        }
+    # NULL mean means there are no completed orders at all
+    if mean is None:
+        return {"anomalies": [], "message": "No data available"}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "mean_revenue": mean,
+        "std_dev": std or 0.0,
+        "threshold": threshold,
+        "anomalies": anomalies
+    }
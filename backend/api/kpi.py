@@ -1,193 +1,303 @@
 # backend/api/kpi.py
 
-from typing import Optional
+import asyncio
+from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Query
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.db import get_db   # ✅ FIXED
+from backend.cache import cached
+from backend.db import AsyncSessionLocal
 
-router = APIRouter()
+router = APIRouter(prefix="/kpi")
 
 
 # -----------------------
-# /kpi/overview
+# SQL statements (built once at import, reused per request)
 # -----------------------
-@router.get("/overview")
-async def kpi_overview(db: AsyncSession = Depends(get_db)):
-    try:
-        sql = text("""
-        WITH total_rev AS (
-          SELECT SUM(oi.quantity * oi.unit_price) AS total_revenue
-          FROM ecom.orders o
-          JOIN ecom.order_items oi ON oi.order_id = o.order_id
-          WHERE o.status = 'completed'
-        ),
-        rev_30d AS (
-          SELECT SUM(oi.quantity * oi.unit_price) AS revenue_30d
-          FROM ecom.orders o
-          JOIN ecom.order_items oi ON oi.order_id = o.order_id
+# Overview: both revenue figures come from one pass over the pre-bucketed
+# ecom.daily_revenue table; MAU counts users with a completed order in the
+# window from ecom.user_order_rollup. The two are independent and run
+# concurrently (see kpi_overview).
+_SQL_REVENUE_TOTALS = text("""
+    SELECT
+      COALESCE(SUM(revenue), 0)::float8 AS total_revenue,
+      COALESCE(SUM(revenue) FILTER (
+        WHERE day >= CURRENT_DATE - 29
+          AND day < CURRENT_DATE + 1
+      ), 0)::float8 AS revenue_30d
+    FROM ecom.daily_revenue;
+""")
+
+# A latest order inside the window settles it; only users whose latest order
+# is future-dated need a look at their orders (idx_orders_completed_date).
+_SQL_MAU_30D = text("""
+    SELECT COUNT(*) AS mau_30d
+    FROM ecom.user_order_rollup r
+    WHERE r.last_order >= CURRENT_DATE - 29
+      AND (
+        r.last_order < CURRENT_DATE + 1
+        OR EXISTS (
+          SELECT 1 FROM ecom.orders o
           WHERE o.status = 'completed'
-            AND o.order_date::timestamp >= now()::date - INTERVAL '29 days'
-        ),
-        mau_30d AS (
-          SELECT COUNT(DISTINCT user_id) AS mau_30d
-          FROM ecom.orders
-          WHERE status = 'completed'
-            AND order_date::timestamp >= now()::date - INTERVAL '29 days'
+            AND o.user_id = r.user_id
+            AND o.order_date >= CURRENT_DATE - 29
+            AND o.order_date < CURRENT_DATE + 1
         )
-        SELECT
-          tr.total_revenue,
-          r30.revenue_30d,
-          m.mau_30d
-        FROM total_rev tr
-        CROSS JOIN rev_30d r30
-        CROSS JOIN mau_30d m;
-        """)
+      );
+""")
+
+# Loose index scan: walk idx_products_category_covering one distinct value
+# at a time (O(#categories) index probes) instead of DISTINCT over every
+# product.
+_SQL_CATEGORIES = text("""
+    WITH RECURSIVE cats AS (
+      (SELECT category FROM ecom.products
+       WHERE category IS NOT NULL
+       ORDER BY category LIMIT 1)
+      UNION ALL
+      SELECT (SELECT p.category FROM ecom.products p
+              WHERE p.category > c.category
+              ORDER BY p.category LIMIT 1)
+      FROM cats c
+      WHERE c.category IS NOT NULL
+    )
+    SELECT category FROM cats WHERE category IS NOT NULL
+    UNION
+    SELECT 'Uncategorized'
+    WHERE EXISTS (SELECT 1 FROM ecom.products WHERE category IS NULL)
+    ORDER BY 1;
+""")
+
+_SQL_REVENUE_TREND = text("""
+    SELECT date_trunc('month', day)::date AS period,
+           COALESCE(SUM(revenue), 0)::float8 AS revenue
+    FROM ecom.daily_revenue
+    WHERE day >= (date_trunc('month', now()) - make_interval(months => :months_back))::date
+    GROUP BY 1
+    ORDER BY 1;
+""")
+
+_SQL_TOP_PRODUCTS = text("""
+    SELECT
+      p.product_id,
+      p.name,
+      COALESCE(SUM(oi.quantity), 0)::bigint AS units_sold,
+      COALESCE(SUM(oi.quantity * oi.unit_price), 0)::float8 AS revenue
+    FROM ecom.order_items oi
+    JOIN ecom.orders o ON o.order_id = oi.order_id AND o.status = 'completed'
+    JOIN ecom.products p ON p.product_id = oi.product_id
+    GROUP BY p.product_id, p.name
+    ORDER BY revenue DESC
+    LIMIT :limit;
+""")
+
+_SQL_PRODUCTS_LIST = text("""
+    SELECT product_id, name
+    FROM ecom.products
+    ORDER BY name
+    LIMIT :limit;
+""")
+
+# Anchor on the orders containing the product (idx_order_items_product_order),
+# then fan out through idx_order_items_order_product; support is computed in
+# the same statement instead of a second round trip.
+_SQL_RECOMMENDATIONS = text("""
+    WITH anchor AS (
+      SELECT DISTINCT order_id
+      FROM ecom.order_items
+      WHERE product_id = :product_id
+    ),
+    cnt AS (
+      SELECT COUNT(*) AS total FROM anchor
+    )
+    SELECT
+      oi.product_id,
+      p.name,
+      COUNT(DISTINCT oi.order_id) AS co_count,
+      COALESCE(SUM(oi.quantity * oi.unit_price), 0)::float8 AS co_revenue,
+      COALESCE(ROUND(COUNT(DISTINCT oi.order_id)::numeric / NULLIF((SELECT total FROM cnt), 0), 4), 0)::float8 AS support
+    FROM ecom.order_items oi
+    JOIN anchor a ON a.order_id = oi.order_id
+    JOIN ecom.products p ON p.product_id = oi.product_id
+    WHERE oi.product_id != :product_id
+    GROUP BY oi.product_id, p.name
+    ORDER BY co_count DESC, co_revenue DESC, oi.product_id
+    LIMIT :limit;
+""")
+
+# _SQL_RECOMMENDATIONS for many anchors in one round trip: the same
+# co_count/co_revenue/support and ordering, capped at :limit per source.
+_SQL_RECOMMENDATIONS_BATCH = text("""
+    WITH anchor AS (
+      SELECT DISTINCT product_id AS source_product_id, order_id
+      FROM ecom.order_items
+      WHERE product_id = ANY(:product_ids)
+    ),
+    cnt AS (
+      SELECT source_product_id, COUNT(*) AS total
+      FROM anchor
+      GROUP BY source_product_id
+    ),
+    co AS (
+      SELECT
+        a.source_product_id,
+        oi.product_id,
+        p.name,
+        COUNT(DISTINCT oi.order_id) AS co_count,
+        COALESCE(SUM(oi.quantity * oi.unit_price), 0)::float8 AS co_revenue
+      FROM ecom.order_items oi
+      JOIN anchor a ON a.order_id = oi.order_id
+      JOIN ecom.products p ON p.product_id = oi.product_id
+      WHERE oi.product_id != a.source_product_id
+      GROUP BY a.source_product_id, oi.product_id, p.name
+    ),
+    ranked AS (
+      SELECT
+        co.*,
+        ROW_NUMBER() OVER (
+          PARTITION BY source_product_id
+          ORDER BY co_count DESC, co_revenue DESC, product_id
+        ) AS rn
+      FROM co
+    )
+    SELECT
+      r.source_product_id,
+      r.product_id,
+      r.name,
+      r.co_count,
+      r.co_revenue,
+      COALESCE(ROUND(r.co_count::numeric / NULLIF(c.total, 0), 4), 0)::float8 AS support
+    FROM ranked r
+    JOIN cnt c ON c.source_product_id = r.source_product_id
+    WHERE r.rn <= :limit
+    ORDER BY r.source_product_id, r.rn;
+""")
+
+
+# -----------------------
+# Session helpers
+# -----------------------
+# Each helper holds a pooled connection only while the query runs; rows are
+# converted to JSON-ready dicts after the session (and connection) is
+# released. Separate sessions also let handlers gather independent queries.
+# Rows come back as mappings: SQL aliases and casts already match the JSON
+# field names and types, so handlers just turn them into dicts.
+async def _fetch_one(sql, params=None):
+    async with AsyncSessionLocal() as session:
+        res = await session.execute(sql, params)
+        return res.mappings().one()
+
 
-        res = await db.execute(sql)
-        row = res.fetchone()
+async def _fetch_all(sql, params=None):
+    async with AsyncSessionLocal() as session:
+        res = await session.execute(sql, params)
+        return res.mappings().all()
 
-        return {
-            "total_revenue": float(row[0] or 0),
-            "revenue_30d": float(row[1] or 0),
-            "mau_30d": int(row[2] or 0),
-        }
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def _stream_dicts(sql, params=None, chunk_size=500):
+    """Like _fetch_all for large results: reads through a server-side cursor
+    in chunks so rows never sit in asyncpg, SQLAlchemy and a list at once."""
+    out = []
+    async with AsyncSessionLocal() as session:
+        res = await session.stream(sql, params)
+        async for part in res.mappings().partitions(chunk_size):
+            out.extend(dict(r) for r in part)
+    return out
+
+
+# -----------------------
+# /kpi/overview
+# -----------------------
+@router.get("/overview")
+@cached("kpi:overview", ttl=60)
+async def kpi_overview():
+    totals, mau = await asyncio.gather(
+        _fetch_one(_SQL_REVENUE_TOTALS),
+        _fetch_one(_SQL_MAU_30D),
+    )
+    return {**totals, **mau}
 
 
 # -----------------------
 # /kpi/categories
 # -----------------------
 @router.get("/categories")
-async def list_categories(db: AsyncSession = Depends(get_db)):
-    try:
-        sql = text("""
-            SELECT DISTINCT COALESCE(category, 'Uncategorized')
-            FROM ecom.products
-            ORDER BY 1;
-        """)
-        res = await db.execute(sql)
-        return [r[0] for r in res.fetchall()]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@cached("kpi:categories", ttl=3600)
+async def list_categories():
+    rows = await _fetch_all(_SQL_CATEGORIES)
+    return [r["category"] for r in rows]
 
 
 # -----------------------
 # /kpi/revenue-trend
 # -----------------------
 @router.get("/revenue-trend")
+@cached("kpi:revenue-trend", ttl=60)
 async def revenue_trend(
     months: int = Query(12, ge=1, le=60),
-    db: AsyncSession = Depends(get_db)
 ):
-    try:
-        sql = text(f"""
-            SELECT date_trunc('month', o.order_date::timestamp)::date AS period,
-                   SUM(oi.quantity * oi.unit_price) AS revenue
-            FROM ecom.orders o
-            JOIN ecom.order_items oi ON oi.order_id = o.order_id
-            WHERE o.status = 'completed'
-              AND o.order_date::timestamp >= date_trunc('month', now()) - INTERVAL '{months - 1} months'
-            GROUP BY 1
-            ORDER BY 1;
-        """)
-        res = await db.execute(sql)
-        return [{"period": r[0], "revenue": float(r[1] or 0)} for r in res.fetchall()]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    rows = await _fetch_all(_SQL_REVENUE_TREND, {"months_back": months - 1})
+    return [dict(r) for r in rows]
 
 
 # -----------------------
 # /kpi/top-products
 # -----------------------
 @router.get("/top-products")
+@cached("kpi:top-products", ttl=60)
 async def top_products(
     limit: int = Query(20, ge=1, le=200),
-    db: AsyncSession = Depends(get_db)
 ):
-    try:
-        sql = text("""
-            SELECT
-              p.product_id,
-              p.name,
-              SUM(oi.quantity) AS units_sold,
-              SUM(oi.quantity * oi.unit_price) AS revenue
-            FROM ecom.order_items oi
-            JOIN ecom.orders o ON o.order_id = oi.order_id AND o.status = 'completed'
-            JOIN ecom.products p ON p.product_id = oi.product_id
-            GROUP BY p.product_id, p.name
-            ORDER BY revenue DESC
-            LIMIT :limit;
-        """)
-        res = await db.execute(sql, {"limit": limit})
-        return [
-            {
-                "product_id": int(r[0]),
-                "name": r[1],
-                "units_sold": int(r[2] or 0),
-                "revenue": float(r[3] or 0),
-            }
-            for r in res.fetchall()
-        ]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    rows = await _fetch_all(_SQL_TOP_PRODUCTS, {"limit": limit})
+    return [dict(r) for r in rows]
 
 
 # -----------------------
 # /kpi/products-list
 # -----------------------
 @router.get("/products-list")
+@cached("kpi:products-list", ttl=60)
 async def products_list(
     limit: int = Query(1000, ge=1, le=5000),
-    db: AsyncSession = Depends(get_db)
 ):
-    try:
-        sql = text("""
-            SELECT product_id, name
-            FROM ecom.products
-            ORDER BY name
-            LIMIT :limit;
-        """)
-        res = await db.execute(sql, {"limit": limit})
-        return [{"product_id": int(r[0]), "name": r[1]} for r in res.fetchall()]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await _stream_dicts(_SQL_PRODUCTS_LIST, {"limit": limit})
 
 
 # -----------------------
 # /kpi/recommendations
 # -----------------------
 @router.get("/recommendations")
+@cached("kpi:recommendations", ttl=3600)
 async def recommendations(
     product_id: int,
     limit: int = Query(10, ge=1, le=50),
-    db: AsyncSession = Depends(get_db)
 ):
-    try:
-        sql = text("""
-            SELECT
-              oi2.product_id,
-              p.name,
-              COUNT(*) AS co_count
-            FROM ecom.order_items oi1
-            JOIN ecom.order_items oi2 ON oi1.order_id = oi2.order_id
-            JOIN ecom.products p ON p.product_id = oi2.product_id
-            WHERE oi1.product_id = :product_id
-              AND oi2.product_id != :product_id
-            GROUP BY oi2.product_id, p.name
-            ORDER BY co_count DESC
-            LIMIT :limit;
-        """)
-        res = await db.execute(
-            sql, {"product_id": product_id, "limit": limit}
-        )
-        return [
-            {"product_id": int(r[0]), "name": r[1], "co_count": int(r[2])}
-            for r in res.fetchall()
-        ]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    rows = await _fetch_all(
+        _SQL_RECOMMENDATIONS, {"product_id": product_id, "limit": limit}
+    )
+    return [dict(r) for r in rows]
+
+
+# -----------------------
+# /kpi/recommendations/batch
+# -----------------------
+# Each source product is its own co-purchase fan-out; cap them per request.
+_BATCH_MAX_PRODUCTS = 100
+
+
+@router.post("/recommendations/batch")
+async def recommendations_batch(
+    product_ids: List[int] = Body(..., min_length=1, max_length=_BATCH_MAX_PRODUCTS),
+    limit: int = Query(10, ge=1, le=50),
+):
+    """
+    Co-purchase recommendations for several products in one query; each
+    source_product_id gets the rows GET /recommendations returns for it,
+    in the same order.
+    """
+    rows = await _fetch_all(
+        _SQL_RECOMMENDATIONS_BATCH,
+        {"product_ids": sorted(set(product_ids)), "limit": limit},
+    )
+    return [dict(r) for r in rows]
@@ -0,0 +1,110 @@
+# backend/cache.py
+
+import functools
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Tuple
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.config import CACHE_NAMESPACE
+from backend.db import redis_client
+
+log = logging.getLogger("backend.cache")
+
+# Past this fraction of the TTL one request refreshes the entry (holding a
+# short lock) while concurrent requests keep serving the cached copy.
+_EARLY_REFRESH = 0.8
+_LOCK_TTL = 5
+
+# In-process fallback used when REDIS_URL is not set.
+# key -> (expires_at, value); values are the handlers' plain dict/list results.
+# Kept in least-recently-used order and never larger than _MAX_ENTRIES.
+_store: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+_MAX_ENTRIES = 1024
+
+
+def _make_key(prefix: str, kwargs: dict) -> str:
+    # Only query params identify a response; injected sessions do not.
+    params = "&".join(
+        f"{k}={v!r}"
+        for k, v in sorted(kwargs.items())
+        if not isinstance(v, AsyncSession)
+    )
+    digest = hashlib.sha1(params.encode()).hexdigest()
+    return f"{CACHE_NAMESPACE}:{prefix}:{digest}"
+
+
+def _prune(now: float) -> None:
+    for key in [k for k, (expires_at, _) in _store.items() if expires_at <= now]:
+        del _store[key]
+
+
+async def _local_get_or_compute(key: str, ttl: int, compute):
+    now = time.monotonic()
+    hit = _store.get(key)
+    if hit is not None and hit[0] > now:
+        _store.move_to_end(key)
+        return hit[1]
+
+    result = await compute()
+    _store[key] = (now + ttl, result)
+    _store.move_to_end(key)
+    if len(_store) > _MAX_ENTRIES:
+        # Expired entries go first; if that is not enough (many distinct
+        # params within one TTL), the least recently used ones follow.
+        _prune(now)
+        while len(_store) > _MAX_ENTRIES:
+            _store.popitem(last=False)
+    return result
+
+
+async def _redis_get_or_compute(key: str, ttl: int, compute):
+    lock_key = f"{key}:lock"
+    try:
+        raw = await redis_client.get(key)
+        if raw is not None:
+            entry = orjson.loads(raw)
+            if time.time() - entry["t"] < ttl * _EARLY_REFRESH:
+                return entry["v"]
+            # Near expiry: only the lock holder recomputes.
+            if not await redis_client.set(lock_key, 1, nx=True, ex=_LOCK_TTL):
+                return entry["v"]
+    except Exception as e:
+        log.warning("Redis read failed for %s: %s", key, e)
+
+    result = await compute()
+
+    try:
+        payload = orjson.dumps({"t": time.time(), "v": result})
+        await redis_client.set(key, payload, ex=ttl)
+        await redis_client.delete(lock_key)
+    except Exception as e:
+        log.warning("Redis write failed for %s: %s", key, e)
+    return result
+
+
+def cached(prefix: str, ttl: int):
+    """
+    Cache-aside for an async endpoint's return value, keyed on its query
+    params, for `ttl` seconds. Uses Redis when REDIS_URL is set, otherwise
+    an in-process store. Place it below the @router decorator. The TTL is
+    kept as `cache_ttl` on the endpoint, where the HTTP cache headers read it.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = _make_key(prefix, kwargs)
+
+            async def compute():
+                return await func(*args, **kwargs)
+
+            if redis_client is not None:
+                return await _redis_get_or_compute(key, ttl, compute)
+            return await _local_get_or_compute(key, ttl, compute)
+        wrapper.cache_ttl = ttl
+        return wrapper
+    return decorator
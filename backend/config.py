@@ -0,0 +1,65 @@
+# backend/config.py
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# Prefix of every cached API response key (backend/cache.py). Bump it to
+# invalidate them all after a shape change; the ETL clears "<namespace>:*"
+# after a load (scripts/etl.py).
+CACHE_NAMESPACE = "v1"
+
+# Streamlit's default local addresses
+_DEFAULT_ORIGINS = "http://localhost:8501,http://127.0.0.1:8501"
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    database_url: Optional[str]
+    redis_url: Optional[str]
+    dev_reload: bool
+    debug_routes: bool
+    cors_origins: Tuple[str, ...]
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Read the environment once per process; later calls return the same
+    frozen Settings. Render injects env vars directly, so .env is only loaded
+    when RENDER is unset (local runs, scripts)."""
+    if not os.getenv("RENDER"):
+        from dotenv import load_dotenv
+        load_dotenv()
+
+    return Settings(
+        database_url=os.getenv("DATABASE_URL"),
+        redis_url=os.getenv("REDIS_URL"),
+        dev_reload=bool(os.getenv("DEV_RELOAD")),
+        debug_routes=bool(os.getenv("DEBUG_ROUTES")),
+        # Comma-separated browser origins allowed to call the API
+        cors_origins=tuple(
+            o.strip()
+            for o in os.getenv("FRONTEND_ORIGINS", _DEFAULT_ORIGINS).split(",")
+            if o.strip()
+        ),
+    )
+
+
+def to_async_url(url: str) -> Tuple[str, Optional[str]]:
+    """
+    Rewrite a postgres:// / postgresql:// URL for the asyncpg driver and
+    split out libpq's ?sslmode=, which asyncpg does not accept as a connect
+    argument. Returns (async_url, sslmode).
+    """
+    from sqlalchemy.engine import make_url
+
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql+asyncpg://", 1)
+    elif url.startswith("postgresql://") and "+asyncpg" not in url:
+        url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    parsed = make_url(url)
+    ssl_mode = parsed.query.get("sslmode")
+    parsed = parsed.difference_update_query(["sslmode"])
+    return parsed.render_as_string(hide_password=False), ssl_mode
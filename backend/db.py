@@ -1,39 +1,134 @@
 # backend/db.py
 
-import os
+import ssl
+import asyncio
 import logging
-from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from typing import AsyncGenerator
+from functools import lru_cache
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
+from typing import AsyncGenerator, Optional, Union
+
+from backend.config import get_settings, to_async_url
 
-load_dotenv()
 log = logging.getLogger("backend.db")
+settings = get_settings()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set")
 
-# Ensure asyncpg driver
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
-elif DATABASE_URL.startswith("postgresql://") and "+asyncpg" not in DATABASE_URL:
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+def _database_url():
+    # scripts/bake_db_url.py can pre-compute the async URL for a deployment;
+    # otherwise it is derived from DATABASE_URL here.
+    try:
+        from backend._db_config import DATABASE_URL_ASYNC, SSL_MODE
+        return DATABASE_URL_ASYNC, SSL_MODE
+    except ImportError:
+        if not settings.database_url:
+            raise RuntimeError("DATABASE_URL is not set")
+        return to_async_url(settings.database_url)
 
-log.info("Database URL loaded (masked)")
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True,
-)
+# Loopback connections (local Postgres, test runs) skip TLS unless the URL
+# asks for it: an explicit sslmode, e.g. require on an SSH tunnel to a
+# remote database, is always honoured.
+_LOOPBACK_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+@lru_cache(maxsize=None)
+def _ssl_arg(ssl_mode: Optional[str]) -> Union[ssl.SSLContext, str, bool, None]:
+    """asyncpg's ssl= connect argument for a libpq sslmode (None: leave it
+    out). Modes that must encrypt get one SSLContext shared by every pooled
+    connection: building a context loads the trust store, so it is done once
+    and never per connection; it is not modified after this point."""
+    if ssl_mode == "disable":
+        return False
+    if ssl_mode in ("allow", "prefer"):
+        # asyncpg implements the plain-text fallback for these itself
+        return ssl_mode
+    if ssl_mode == "require":
+        # libpq "require": encrypt, but do not verify the server certificate
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        return ctx
+    if ssl_mode in ("verify-ca", "verify-full"):
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = ssl_mode == "verify-full"
+        return ctx
+    return None
+
+
+@lru_cache(maxsize=1)
+def _build_engine() -> AsyncEngine:
+    """URL cleanup, SSL setup and engine creation, done once per process
+    however often it is asked for."""
+    url, ssl_mode = _database_url()
+    if ssl_mode is None and make_url(url).host in _LOOPBACK_HOSTS:
+        # Left unset, asyncpg would fall back to PGSSLMODE/prefer and still try TLS
+        ssl_mode = "disable"
+    ssl_arg = _ssl_arg(ssl_mode)
+    log.info("Database URL loaded (masked)")
+
+    # Sized for concurrent dashboard load (overview alone fans out to two
+    # connections); recycle before managed poolers drop idle connections.
+    pool_args = dict(
+        pool_size=20,
+        max_overflow=20,
+        pool_timeout=10,
+        pool_recycle=1800,
+    )
+    # Under `uvicorn --reload` each reload leaves the old pool's connections
+    # behind; opt into unpooled connections for local development only.
+    if settings.dev_reload:
+        pool_args = dict(poolclass=NullPool)
 
-AsyncSessionLocal = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
+    return create_async_engine(
+        url,
+        echo=False,
+        pool_pre_ping=True,
+        # Compiled-statement cache per engine (default 500); sized so the
+        # API's statements and their parameter shapes never evict each other.
+        query_cache_size=1200,
+        **pool_args,
+        # Hot text() statements are module-level constants, so each pooled
+        # connection prepares them once and reuses the server-side plan.
+        connect_args={
+            "prepared_statement_cache_size": 512,
+            "statement_cache_size": 1024,
+            "command_timeout": 15,
+            # Name the connections in pg_stat_activity; small dashboard
+            # aggregates never benefit from JIT but can stall compiling it.
+            "server_settings": {"application_name": "ecom-analytics", "jit": "off"},
+            **({"ssl": ssl_arg} if ssl_arg is not None else {}),
+        },
+    )
+
+
+engine = _build_engine()
+
+AsyncSessionLocal = async_sessionmaker(
+    engine,
     expire_on_commit=False,
+    autoflush=False,
 )
 
+# Optional shared response cache (see backend/cache.py)
+REDIS_URL = settings.redis_url
+redis_client = None
+if REDIS_URL:
+    import redis.asyncio as aioredis
+    redis_client = aioredis.from_url(REDIS_URL)
+    log.info("Redis response cache enabled")
+
+async def warm_pool(n: int = 4) -> None:
+    """Open `n` pooled connections up front so the first requests after a
+    deploy skip the TCP/TLS handshake."""
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(n)))
+
 # ✅ SINGLE dependency used everywhere
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
@@ -1,26 +1,73 @@
 # backend/main.py
 
+import asyncio
+import hashlib
 import logging
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Optional
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("backend.main")
 
+from backend.config import get_settings
+from backend.db import engine, warm_pool
+
+# An unreachable database must not hold up startup
+_WARM_POOL_TIMEOUT = 5
+
+# -----------------------
+# Lifespan: warm the pool before serving, release it on shutdown
+# -----------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await asyncio.wait_for(warm_pool(), timeout=_WARM_POOL_TIMEOUT)
+        log.info("Database pool warmed")
+    except asyncio.TimeoutError:
+        log.warning("Database pool warm-up timed out after %ss; continuing", _WARM_POOL_TIMEOUT)
+    except Exception as e:
+        # Not fatal: requests will open connections on demand
+        log.warning("Database pool warm-up failed: %s", e)
+    log.info("Application startup complete")
+    # DEBUG_ROUTES=1 lists every registered route at startup
+    if get_settings().debug_routes:
+        log.info("Registered routes:")
+        for r in app.routes:
+            # Newer FastAPI keeps included routers as path-less entries
+            if hasattr(r, "path"):
+                log.info("  %s %s", r.path, getattr(r, "methods", None))
+
+    yield
+
+    # Close pooled DB connections cleanly instead of leaving them to the server
+    await engine.dispose()
+    log.info("Database engine disposed")
+
+
 app = FastAPI(
     title="E-Commerce Analytics API",
     version="1.0.0",
+    lifespan=lifespan,
+    # orjson encodes the list endpoints (and date/datetime values) natively
+    default_response_class=ORJSONResponse,
 )
 
 # -----------------------
-# CORS (safe for frontend usage)
+# CORS (explicit frontend allowlist, FRONTEND_ORIGINS)
 # -----------------------
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],   # tighten later in prod
+    allow_origins=list(get_settings().cors_origins),
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["authorization", "content-type", "if-none-match"],
+    # Browsers reuse a preflight result for a day
+    max_age=86400,
 )
 
 # -----------------------
@@ -29,25 +76,112 @@ app.add_middleware(
 from backend.api.kpi import router as kpi_router
 from backend.api.anomalies import router as anomalies_router
 
-app.include_router(kpi_router, prefix="/kpi")
+app.include_router(kpi_router)
 log.info("KPI router loaded")
 
-app.include_router(anomalies_router, prefix="/kpi")
+app.include_router(anomalies_router)
 log.info("Anomalies router loaded")
 
+# -----------------------
+# HTTP caching for read-only KPI endpoints
+# -----------------------
+# Browsers/CDNs may reuse a KPI response for max-age seconds (matching the
+# server-side @cached TTL, which it sets as cache_ttl on the endpoint) and
+# revalidate with If-None-Match afterwards; an unchanged body is answered
+# with an empty 304. Routes without @cached get the default.
+_DEFAULT_MAX_AGE = 60
+
+
+def _max_age(scope: Scope) -> int:
+    # The router records the matched endpoint in the scope before responding
+    return getattr(scope.get("endpoint"), "cache_ttl", _DEFAULT_MAX_AGE)
+
+
+def _etag(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def _etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    # If-None-Match uses weak comparison: W/ prefixes are ignored
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    opaque = etag.removeprefix("W/")
+    return "*" in tags or any(t.removeprefix("W/") == opaque for t in tags)
+
+
+class HTTPCacheMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware wrapping of every request):
+    only 200 responses to GET /kpi/* are buffered to hash their body;
+    everything else streams through untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        path = scope.get("path", "")
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not path.startswith("/kpi/")
+            or path.endswith("/health")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        chunks = []
+
+        async def send_wrapper(message: Message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                if message["status"] != 200:
+                    await send(message)
+                    return
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            etag = _etag(body)
+            # raw header list: repeated headers (Set-Cookie, Vary) survive
+            headers = MutableHeaders(raw=list(start["headers"]))
+            headers["ETag"] = etag
+            headers["Cache-Control"] = f"public, max-age={_max_age(scope)}"
+
+            if _etag_matches(etag, Headers(scope=scope).get("if-none-match")):
+                del headers["content-length"]
+                await send({"type": "http.response.start", "status": 304, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+app.add_middleware(HTTPCacheMiddleware)
+
+# -----------------------
+# Errors: one place for unexpected failures instead of per-route try/except
+# -----------------------
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    log.exception("Unhandled error on %s %s", request.method, request.url.path)
+    return ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
+
 # -----------------------
 # Root health
 # -----------------------
 @app.get("/")
 async def root():
     return {"status": "running"}
-
-# -----------------------
-# Startup log (helps on Render)
-# -----------------------
-@app.on_event("startup")
-async def startup_event():
-    log.info("Application startup complete")
-    log.info("Registered routes:")
-    for r in app.routes:
-        log.info("  %s %s", r.path, getattr(r, "methods", None))
@@ -0,0 +1,36 @@
+# scripts/bake_db_url.py
+"""
+Write backend/_db_config.py with the async database URL (and sslmode)
+derived from DATABASE_URL, so backend/db.py imports it instead of
+rewriting the URL at startup. Run as part of the build:
+
+    python scripts/bake_db_url.py
+
+The generated file contains credentials and is git-ignored. Re-run it (or
+delete the file) whenever DATABASE_URL changes.
+"""
+import os
+import sys
+sys.path.append(".")
+
+from backend.config import get_settings, to_async_url
+
+OUT_PATH = os.path.join(os.path.dirname(__file__), "..", "backend", "_db_config.py")
+
+
+def main():
+    settings = get_settings()
+    if not settings.database_url:
+        print("ERROR: DATABASE_URL is not set.")
+        sys.exit(1)
+
+    url, ssl_mode = to_async_url(settings.database_url)
+    with open(OUT_PATH, "w", encoding="utf-8") as f:
+        f.write("# Generated by scripts/bake_db_url.py -- do not edit or commit.\n")
+        f.write(f"DATABASE_URL_ASYNC = {url!r}\n")
+        f.write(f"SSL_MODE = {ssl_mode!r}\n")
+    print(f"Wrote {os.path.normpath(OUT_PATH)}")
+
+
+if __name__ == "__main__":
+    main()
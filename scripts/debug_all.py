@@ -0,0 +1,60 @@
+# scripts/debug_all.py
+"""
+Call API endpoints in-process and print status + body (and the server
+traceback on 5xx). backend.main is imported and the TestClient built once
+for all checks.
+
+    python scripts/debug_all.py                 # every check
+    python scripts/debug_all.py overview trend  # selected checks
+"""
+import sys, traceback
+sys.path.append(".")
+
+from fastapi.testclient import TestClient
+
+try:
+    from backend.main import app
+except Exception:
+    print("ERROR importing backend.main:")
+    traceback.print_exc()
+    raise SystemExit(1)
+
+client = TestClient(app, raise_server_exceptions=False)
+
+# name -> (path, query params)
+CHECKS = {
+    "categories": ("/kpi/categories", None),
+    "overview": ("/kpi/overview", None),
+    "trend": ("/kpi/revenue-trend", {"months": 12}),
+    "anomalies": ("/kpi/anomalies/revenue", None),
+}
+
+
+def run(name):
+    path, params = CHECKS[name]
+    print("=" * 80)
+    print(f"CALLING {path} with params: {params}")
+    resp = client.get(path, params=params)
+    print("Status code:", resp.status_code)
+    try:
+        print("Response JSON:", resp.json())
+    except Exception:
+        print("Response text:", resp.text)
+
+    # Re-call with server exceptions enabled to capture the traceback
+    if resp.status_code >= 500:
+        client.raise_server_exceptions = True
+        try:
+            client.get(path, params=params)
+        except Exception:
+            print("\n--- SERVER TRACEBACK START ---")
+            traceback.print_exc()
+            print("--- SERVER TRACEBACK END ---")
+        finally:
+            client.raise_server_exceptions = False
+    print()
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or CHECKS:
+        run(name)
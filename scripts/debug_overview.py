@@ -1,5 +1,6 @@
 import os
-from dotenv import load_dotenv
-load_dotenv()
+import sys
+sys.path.append(".")
+from backend.config import get_settings
 print("CWD:", os.getcwd())
-print("DATABASE_URL (masked):", ("<not set>" if not os.getenv('DATABASE_URL') else "<set>"))
\ No newline at end of file
+print("DATABASE_URL (masked):", ("<not set>" if not get_settings().database_url else "<set>"))
\ No newline at end of file
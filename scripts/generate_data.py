@@ -1,66 +1,86 @@
 from faker import Faker
-import random, csv
-from datetime import datetime
+import numpy as np
+import pandas as pd
 fake = Faker()
 Faker.seed(42)
-random.seed(42)
+rng = np.random.default_rng(42)
 
 NUM_USERS = 5000
 NUM_PRODUCTS = 500
 NUM_ORDERS = 20000
+NUM_REVIEWS = 5000
+
+# Every column is drawn as a whole array; Faker is only used to build small
+# pools of text that rows are sampled from (it is slow per call).
+now = pd.Timestamp.now().floor("s")
+
+def random_datetimes(n, years):
+    seconds = rng.integers(0, years * 365 * 86400, size=n)
+    return (now - pd.to_timedelta(seconds, unit="s")).strftime("%Y-%m-%dT%H:%M:%S")
+
+def sentences(n, nb_words):
+    pool = np.array([fake.sentence(nb_words=nb_words) for _ in range(500)])
+    return rng.choice(pool, size=n)
+
+def prices(n):
+    return np.round(rng.uniform(5, 500, size=n), 2)
 
 # Users
-with open("data/users.csv", "w", newline='', encoding='utf-8') as f:
-    w = csv.writer(f)
-    w.writerow(["user_id","email","signup_date","country","user_type"])
-    for i in range(1, NUM_USERS+1):
-        signup = fake.date_between(start_date='-3y', end_date='today')
-        w.writerow([i, f"user{i}@example.com", signup.isoformat(), fake.country(), random.choice(["regular","vip"])])
+user_ids = np.arange(1, NUM_USERS + 1)
+countries = np.array([fake.country() for _ in range(250)])
+signup_days = rng.integers(0, 3 * 365 + 1, size=NUM_USERS)
+pd.DataFrame({
+    "user_id": user_ids,
+    "email": [f"user{i}@example.com" for i in user_ids],
+    "signup_date": (now.normalize() - pd.to_timedelta(signup_days, unit="D")).strftime("%Y-%m-%d"),
+    "country": rng.choice(countries, size=NUM_USERS),
+    "user_type": rng.choice(["regular", "vip"], size=NUM_USERS),
+}).to_csv("data/users.csv", index=False)
 
 # Products
 categories = ["Shoes","Apparel","Electronics","Home","Beauty","Sports"]
-with open("data/products.csv","w",newline='',encoding='utf-8') as f:
-    w=csv.writer(f)
-    w.writerow(["product_id","sku","name","description","category","price"])
-    for i in range(1, NUM_PRODUCTS+1):
-        name = fake.word().capitalize() + " " + random.choice(["Pro","X","Plus","Lite","Max"])
-        desc = fake.sentence(nb_words=12)
-        price = round(random.uniform(5, 500),2)
-        w.writerow([i, f"SKU-{i:05d}", name, desc, random.choice(categories), price])
+product_ids = np.arange(1, NUM_PRODUCTS + 1)
+words = np.array([fake.word().capitalize() for _ in range(500)])
+suffixes = rng.choice(["Pro","X","Plus","Lite","Max"], size=NUM_PRODUCTS)
+pd.DataFrame({
+    "product_id": product_ids,
+    "sku": [f"SKU-{i:05d}" for i in product_ids],
+    "name": np.char.add(np.char.add(rng.choice(words, size=NUM_PRODUCTS), " "), suffixes),
+    "description": sentences(NUM_PRODUCTS, 12),
+    "category": rng.choice(categories, size=NUM_PRODUCTS),
+    "price": prices(NUM_PRODUCTS),
+}).to_csv("data/products.csv", index=False)
 
 # Orders & Order Items
-with open("data/orders.csv","w",newline='',encoding='utf-8') as fo, open("data/order_items.csv","w",newline='',encoding='utf-8') as fi:
-    wo=csv.writer(fo); wi=csv.writer(fi)
-    wo.writerow(["order_id","user_id","order_date","status","total_amount"])
-    wi.writerow(["order_item_id","order_id","product_id","quantity","unit_price"])
-    order_item_id = 1
-    for oid in range(1, NUM_ORDERS+1):
-        uid = random.randint(1, NUM_USERS)
-        date = fake.date_time_between(start_date='-2y', end_date='now')
-        status = random.choices(["completed","cancelled","returned"], weights=[0.9,0.07,0.03])[0]
-        num_items = random.choices([1,2,3,4], weights=[0.6,0.25,0.1,0.05])[0]
-        total = 0
-        for _ in range(num_items):
-            pid = random.randint(1, NUM_PRODUCTS)
-            qty = random.choices([1,2,3], weights=[0.8,0.15,0.05])[0]
-            price = round(random.uniform(5, 500),2)
-            total += price * qty
-            wi.writerow([order_item_id, oid, pid, qty, price])
-            order_item_id += 1
-        wo.writerow([oid, uid, date.isoformat(), status, round(total,2)])
+order_ids = np.arange(1, NUM_ORDERS + 1)
+num_items = rng.choice([1,2,3,4], p=[0.6,0.25,0.1,0.05], size=NUM_ORDERS)
+num_order_items = int(num_items.sum())
+items = pd.DataFrame({
+    "order_item_id": np.arange(1, num_order_items + 1),
+    "order_id": np.repeat(order_ids, num_items),
+    "product_id": rng.integers(1, NUM_PRODUCTS + 1, size=num_order_items),
+    "quantity": rng.choice([1,2,3], p=[0.8,0.15,0.05], size=num_order_items),
+    "unit_price": prices(num_order_items),
+})
+items.to_csv("data/order_items.csv", index=False)
+
+totals = (items["unit_price"] * items["quantity"]).groupby(items["order_id"]).sum()
+pd.DataFrame({
+    "order_id": order_ids,
+    "user_id": rng.integers(1, NUM_USERS + 1, size=NUM_ORDERS),
+    "order_date": random_datetimes(NUM_ORDERS, 2),
+    "status": rng.choice(["completed","cancelled","returned"], p=[0.9,0.07,0.03], size=NUM_ORDERS),
+    "total_amount": totals.reindex(order_ids).round(2).to_numpy(),
+}).to_csv("data/orders.csv", index=False)
 
 # Reviews
-with open("data/reviews.csv","w",newline='',encoding='utf-8') as f:
-    w=csv.writer(f)
-    w.writerow(["review_id","product_id","user_id","rating","review_text","review_date"])
-    rid=1
-    for _ in range(5000):
-        pid=random.randint(1,NUM_PRODUCTS)
-        uid=random.randint(1,NUM_USERS)
-        rating=random.randint(1,5)
-        text=fake.sentence(nb_words=20)
-        date=fake.date_time_between(start_date='-2y', end_date='now')
-        w.writerow([rid,pid,uid,rating,text,date.isoformat()])
-        rid+=1
+pd.DataFrame({
+    "review_id": np.arange(1, NUM_REVIEWS + 1),
+    "product_id": rng.integers(1, NUM_PRODUCTS + 1, size=NUM_REVIEWS),
+    "user_id": rng.integers(1, NUM_USERS + 1, size=NUM_REVIEWS),
+    "rating": rng.integers(1, 6, size=NUM_REVIEWS),
+    "review_text": sentences(NUM_REVIEWS, 20),
+    "review_date": random_datetimes(NUM_REVIEWS, 2),
+}).to_csv("data/reviews.csv", index=False)
 
 print("CSV generation complete.")
@@ -1,9 +1,17 @@
 # streamlit/app.py
 import os
+import time
+import asyncio
+import hashlib
+import threading
 import streamlit as st
 import pandas as pd
-import requests
+import httpx
+import orjson
 import altair as alt
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from collections import OrderedDict
 from datetime import date, timedelta, datetime
 from io import BytesIO
 
@@ -11,19 +19,216 @@ from io import BytesIO
 API_BASE = os.getenv("API_BASE", "http://127.0.0.1:8000/kpi")  # read from env or use local
 st.set_page_config(page_title="E-Commerce Analytics", layout="wide")
 
+# Column types applied once when API payloads become DataFrames
+TREND_DTYPES = {"revenue": "float64"}
+TOP_PROD_DTYPES = {"revenue": "float64", "units_sold": "int64", "price": "float64"}
+TOP_CUST_DTYPES = {"lifetime_revenue": "float64"}
+REVIEWS_DTYPES = {"rating": "Int64"}
+SENTIMENT_ORDER = {"negative": 0, "neutral": 1, "positive": 2}
+
+# Tables are passed whole to st.dataframe with a column_order (no slice copy);
+# money columns are formatted in the browser.
+MONEY = st.column_config.NumberColumn(format="$%.2f")
+PERCENT = st.column_config.NumberColumn(format="percent")
+
+# Optional Redis cache shared by all Streamlit workers/sessions (REDIS_URL).
+# Entries outlive their freshness window so a stale copy can be shown
+# while the API is unreachable.
+REDIS_URL = os.getenv("REDIS_URL")
+_redis = None
+if REDIS_URL:
+    import redis
+    _redis = redis.Redis.from_url(REDIS_URL)
+
+CACHE_TTLS = {"/categories": 3600, "/overview": 30, "/reviews": 10}
+DEFAULT_CACHE_TTL = 60
+STALE_KEEP = 86400
+
 # ---------- Helpers ----------
-@st.cache_data(ttl=60)
+# One keep-alive HTTP client per Streamlit process. Module-level code runs
+# again on every rerun, so the client lives in st.cache_resource instead.
+@st.cache_resource
+def _http() -> httpx.Client:
+    return httpx.Client(
+        base_url=API_BASE,
+        timeout=10,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+    )
+
+def _cache_key(path: str, params: dict = None) -> str:
+    # API_BASE is part of the key: dashboards for different backends
+    # (staging/prod) may share one Redis.
+    raw = f"{API_BASE}|{path}|{sorted((params or {}).items())}".encode()
+    return "st:" + hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+def _cache_ttl(path: str) -> int:
+    return CACHE_TTLS.get(path, DEFAULT_CACHE_TTL)
+
+def _l2_lookup(path: str, params: dict = None):
+    """Return (body, stale_at) from Redis, or (None, 0.0) on a miss."""
+    if _redis is None:
+        return None, 0.0
+    try:
+        hit = _redis.hgetall(_cache_key(path, params))
+    except Exception:
+        return None, 0.0
+    if not hit:
+        return None, 0.0
+    return hit[b"body"], float(hit[b"stale_at"])
+
+def _l2_store(path: str, params: dict, body: bytes):
+    if _redis is None:
+        return
+    key = _cache_key(path, params)
+    try:
+        _redis.hset(key, mapping={"body": body, "stale_at": time.time() + _cache_ttl(path)})
+        _redis.expire(key, STALE_KEEP)
+    except Exception:
+        pass
+
+def _resolve(path: str, params: dict, body, result):
+    """Turn a fetch result (bytes or exception) into JSON, falling back to
+    a stale cached body (with a warning) when the API call failed."""
+    if isinstance(result, Exception):
+        if body is not None:
+            st.warning(f"API unavailable for `{path}`; showing cached data that may be out of date.")
+            return orjson.loads(body)
+        return {"__error__": str(result)}
+    _l2_store(path, params, result)
+    return orjson.loads(result)
+
+# Per-endpoint in-process memo in front of Redis, so changing one filter
+# only refetches the endpoints whose params changed. key -> (expires_at,
+# value), in least-recently-used order and at most L1_MAX_ENTRIES long.
+# Entries expire with the endpoint's CACHE_TTLS freshness, never later.
+L1_MAX_ENTRIES = 256
+
+@st.cache_resource
+def _l1_store():
+    # Shared by every session's script thread: only touch it under the lock
+    return threading.Lock(), OrderedDict()
+
+def _l1_get(key: str):
+    lock, store = _l1_store()
+    with lock:
+        hit = store.get(key)
+        if hit is None:
+            return None
+        if hit[0] <= time.time():
+            del store[key]
+            return None
+        store.move_to_end(key)
+        return hit[1]
+
+def _l1_put(key: str, value, expires_at: float):
+    lock, store = _l1_store()
+    now = time.time()
+    with lock:
+        store[key] = (expires_at, value)
+        store.move_to_end(key)
+        if len(store) > L1_MAX_ENTRIES:
+            for k in [k for k, (exp, _) in store.items() if exp <= now]:
+                del store[k]
+            while len(store) > L1_MAX_ENTRIES:
+                store.popitem(last=False)
+
+def _settle(path: str, params: dict, body, stale_at: float, result):
+    """JSON for one endpoint. result is None when the Redis copy was fresh,
+    else the API's bytes or exception. Fresh values are memoized in L1 until
+    the Redis copy goes stale (or for the endpoint's TTL when just fetched);
+    errors and stale fallbacks are retried on the next rerun."""
+    key = _cache_key(path, params)
+    if result is None:
+        value = orjson.loads(body)
+        _l1_put(key, value, stale_at)
+        return value
+    value = _resolve(path, params, body, result)
+    if not isinstance(result, Exception):
+        _l1_put(key, value, time.time() + _cache_ttl(path))
+    return value
+
 def fetch_json(path: str, params: dict = None):
-    url = f"{API_BASE}{path}"
+    hit = _l1_get(_cache_key(path, params))
+    if hit is not None:
+        return hit
+    body, stale_at = _l2_lookup(path, params)
+    result = None
+    if stale_at <= time.time():
+        try:
+            r = _http().get(path, params=params)
+            r.raise_for_status()
+            result = r.content
+        except Exception as e:
+            result = e
+    return _settle(path, params, body, stale_at, result)
+
+async def _fetch_many(spec: dict) -> dict:
+    async with httpx.AsyncClient(base_url=API_BASE, timeout=10) as client:
+        async def one(path, params):
+            try:
+                r = await client.get(path, params=params)
+                r.raise_for_status()
+                return r.content
+            except Exception as e:
+                return e
+        results = await asyncio.gather(*(one(p, q) for p, q in spec.values()))
+    return dict(zip(spec.keys(), results))
+
+def fetch_all(spec: dict) -> dict:
+    """Fetch several independent endpoints concurrently.
+    spec maps a name to (path, params); results come back under the same names."""
+    out, pending = {}, {}
+    for name, (path, params) in spec.items():
+        hit = _l1_get(_cache_key(path, params))
+        if hit is not None:
+            out[name] = hit
+        else:
+            pending[name] = (path, params)
+
+    now = time.time()
+    cached = {name: _l2_lookup(path, params) for name, (path, params) in pending.items()}
+    misses = {name: pending[name] for name, (_, stale_at) in cached.items() if stale_at <= now}
+    fetched = asyncio.run(_fetch_many(misses)) if misses else {}
+
+    for name, (path, params) in pending.items():
+        body, stale_at = cached[name]
+        out[name] = _settle(path, params, body, stale_at, fetched.get(name))
+    return out
+
+# Probed at most every 10s, not on every widget-triggered rerun
+@st.cache_data(ttl=10)
+def _backend_ok() -> bool:
     try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        return r.json()
-    except Exception as e:
-        return {"__error__": str(e)}
+        return _http().get("/anomalies/health", timeout=2).status_code == 200
+    except Exception:
+        return False
+
+# Bare header like DataFrame.to_csv. Arrow quotes every text value (valid
+# CSV, read the same by spreadsheets and pandas); other values are bare.
+CSV_WRITE_OPTIONS = pacsv.WriteOptions(quoting_style="needed", quoting_header="none")
+
+def _csv_datetime(col: pd.Series) -> pd.Series:
+    # Arrow writes timestamps as "2024-01-01 00:00:00.000000"; like to_csv,
+    # write dates when every value is midnight, else whole seconds
+    values = col.dropna()
+    if (values == values.dt.normalize()).all():
+        return col.dt.date
+    return col.astype("datetime64[s]")
 
 def df_to_csv_bytes(df: pd.DataFrame) -> bytes:
-    return df.to_csv(index=False).encode("utf-8")
+    # Arrow's CSV writer avoids pandas' per-cell Python quoting on text columns
+    dt_cols = df.select_dtypes(include=["datetime"]).columns
+    if len(dt_cols):
+        df = df.assign(**{c: _csv_datetime(df[c]) for c in dt_cols})
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf, CSV_WRITE_OPTIONS)
+    return buf.getvalue().to_pybytes()
+
+def sentiment_sort_key(col: pd.Series) -> pd.Series:
+    # sort_values key: rank sentiment labels, leave other columns as they are
+    if col.name != "sentiment":
+        return col
+    return col.map(SENTIMENT_ORDER).fillna(len(SENTIMENT_ORDER))
 
 def fmt_money(v):
     try:
@@ -40,11 +245,7 @@ with st.sidebar:
     st.header("Filters & Connection")
     st.write("API base:", f"`{API_BASE}`")
     # quick backend test
-    try:
-        resp = requests.get(f"{API_BASE}/anomalies/health", timeout=2)
-        backend_ok = resp.status_code == 200
-    except Exception:
-        backend_ok = False
+    backend_ok = _backend_ok()
 
     if not backend_ok:
         st.error("Backend unreachable. Start the FastAPI server (see terminal).")
@@ -114,8 +315,37 @@ with st.sidebar:
 
 st.markdown("---")
 
-# ---------- Fetch overview (KPIs) ----------
-overview = fetch_json("/overview")
+# ---------- Fetch dashboard data (all known-parameter endpoints at once) ----------
+def common_filters() -> dict:
+    # Price/category filters shared by trend, category and product calls;
+    # normalized so cache keys stay stable across reruns.
+    f = {"min_price": round(price_range[0], 2), "max_price": round(price_range[1], 2)}
+    if selected_cats:
+        f["categories"] = ",".join(sorted(selected_cats))
+    return f
+
+base = common_filters()
+date_filters = {}
+if use_date_range and start_date and end_date:
+    date_filters = {"start_date": start_date.isoformat(), "end_date": end_date.isoformat()}
+
+trend_params = {**base, **date_filters} if date_filters else {**base, "period": period, "months": months}
+rb_params = {**base, **date_filters}
+tp_params = {**base, "limit": top_n}
+reviews_params = {"limit": 200, "min_rating": 0}
+
+data = fetch_all({
+    "overview": ("/overview", None),
+    "trend": ("/revenue-trend", trend_params),
+    "rev_by_cat": ("/revenue-by-category", rb_params),
+    "top_products": ("/products-by-category", tp_params),
+    "customer_insights": ("/customer-insights", None),
+    "reviews": ("/reviews", reviews_params),
+    "products_list": ("/products-list", None),
+})
+
+# ---------- Overview (KPIs) ----------
+overview = data["overview"]
 if "__error__" in overview:
     st.error(f"API error - /overview: {overview['__error__']}")
     st.stop()
@@ -131,9 +361,9 @@ kpi_col5.metric("Snapshot time", pd.Timestamp.now().strftime("%Y-%m-%d %H:%M"))
 # ---------- AI-Style KPI Insights ----------
 st.subheader("📊 Smart KPI Insights")
 
-def generate_kpi_insights(overview, top_products):
+@st.cache_data(ttl=60)
+def _insights(pct, ret, mau, top_name, top_rev) -> tuple:
     insights = []
-    pct = overview.get("pct_change_vs_prev_30d")
     if pct is not None:
         try:
             p = float(pct)
@@ -146,7 +376,6 @@ def generate_kpi_insights(overview, top_products):
         except Exception:
             pass
 
-    ret = overview.get("pct_returning_30d")
     if ret is not None:
         try:
             r = float(ret)
@@ -159,60 +388,46 @@ def generate_kpi_insights(overview, top_products):
         except Exception:
             pass
 
-    insights.append(f"Active users in last 30 days: **{overview.get('mau_30d', 0)}**.")
+    insights.append(f"Active users in last 30 days: **{mau}**.")
 
-    if isinstance(top_products, list) and len(top_products) > 0:
-        tp = top_products[0]
-        revenue = tp.get("revenue", 0)
-        name = tp.get("name", "Top Product")
+    if top_name is not None:
         try:
-            insights.append(f"Top product **{name}** generated **${float(revenue):,.2f}** in revenue.")
+            insights.append(f"Top product **{top_name}** generated **${float(top_rev):,.2f}** in revenue.")
         except Exception:
-            insights.append(f"Top product **{name}** generated revenue (value unavailable).")
-    return insights
-
-# placeholder until top_products loaded
-insights = generate_kpi_insights(overview, [])
-for line in insights:
+            insights.append(f"Top product **{top_name}** generated revenue (value unavailable).")
+    return tuple(insights)
+
+# top products are already fetched above, so insights are built once, complete
+top_products = data["top_products"]
+top = top_products[0] if isinstance(top_products, list) and top_products else {}
+for line in _insights(
+    overview.get("pct_change_vs_prev_30d"),
+    overview.get("pct_returning_30d"),
+    overview.get("mau_30d", 0),
+    top.get("name", "Top Product") if top else None,
+    top.get("revenue", 0),
+):
     st.write("• " + line)
 
 st.markdown("---")
 
 # ---------- Revenue Trend ----------
 st.subheader("Revenue Trend")
-
-trend_params = {}
-if use_date_range and start_date and end_date:
-    trend_params["start_date"] = start_date.isoformat()
-    trend_params["end_date"] = end_date.isoformat()
-else:
-    trend_params["period"] = period
-    trend_params["months"] = months
-
-# filters
-trend_params["min_price"] = price_range[0]
-trend_params["max_price"] = price_range[1]
-if selected_cats:
-    trend_params["categories"] = ",".join(selected_cats)
-
-trend = fetch_json("/revenue-trend", params=trend_params)
+trend = data["trend"]
 if "__error__" in trend:
     st.error(f"API error - /revenue-trend: {trend['__error__']}")
 else:
-    trend_df = pd.DataFrame(trend)
+    trend_df = pd.DataFrame.from_records(trend)
     if trend_df.empty:
         st.info("No revenue data for selected filters.")
     else:
-        trend_df["period"] = pd.to_datetime(trend_df["period"])
-        chart = (
-            alt.Chart(trend_df)
-            .mark_area(opacity=0.2)
-            .encode(x=alt.X("period:T", title="Date"), y=alt.Y("revenue:Q", title="Revenue"))
-        ) + (
-            alt.Chart(trend_df)
-            .mark_line(point=True)
-            .encode(x="period:T", y="revenue:Q")
+        trend_df = trend_df.astype(TREND_DTYPES)
+        trend_df["period"] = pd.to_datetime(trend_df["period"], cache=True, format="ISO8601")
+        # one Chart (one dataset in the spec) shared by both layers
+        trend_base = alt.Chart(trend_df).encode(
+            x=alt.X("period:T", title="Date"), y=alt.Y("revenue:Q", title="Revenue")
         )
+        chart = alt.layer(trend_base.mark_area(opacity=0.2), trend_base.mark_line(point=True))
         # updated param: width="stretch" instead of use_container_width
         st.altair_chart(chart.interactive(), width="stretch")
         st.download_button("Export trend CSV", data=df_to_csv_bytes(trend_df), file_name="revenue_trend.csv")
@@ -221,21 +436,11 @@ st.markdown("---")
 
 # ---------- Revenue by Category ----------
 st.subheader("Revenue by Category")
-rb_params = {
-    "min_price": price_range[0],
-    "max_price": price_range[1]
-}
-if use_date_range and start_date and end_date:
-    rb_params["start_date"] = start_date.isoformat()
-    rb_params["end_date"] = end_date.isoformat()
-if selected_cats:
-    rb_params["categories"] = ",".join(selected_cats)
-
-rev_by_cat = fetch_json("/revenue-by-category", params=rb_params)
+rev_by_cat = data["rev_by_cat"]
 if "__error__" in rev_by_cat:
     st.error(f"API error - /revenue-by-category: {rev_by_cat['__error__']}")
 else:
-    rbc_df = pd.DataFrame(rev_by_cat)
+    rbc_df = pd.DataFrame.from_records(rev_by_cat)
     if rbc_df.empty:
         st.info("No category revenue data.")
     else:
@@ -250,74 +455,81 @@ st.markdown("---")
 
 # ---------- Top Products ----------
 st.subheader("Top Products")
-tp_params = {"limit": top_n, "min_price": price_range[0], "max_price": price_range[1]}
-if selected_cats:
-    tp_params["categories"] = ",".join(selected_cats)
-
-top_products = fetch_json("/products-by-category", params=tp_params)
 if "__error__" in top_products:
     st.error(f"API error - /products-by-category: {top_products['__error__']}")
     top_products = []
 else:
-    tp_df = pd.DataFrame(top_products)
+    tp_df = pd.DataFrame.from_records(top_products)
     if tp_df.empty:
         st.info("No product sales data.")
     else:
-        tp_df["revenue"] = tp_df["revenue"].astype(float)
-        tp_df["units_sold"] = tp_df["units_sold"].astype(int)
+        tp_df = tp_df.astype(TOP_PROD_DTYPES)
         c1, c2 = st.columns([2, 1])
         with c1:
-            st.dataframe(tp_df[["product_id", "name", "price", "units_sold", "revenue"]], height=300)
+            st.dataframe(
+                tp_df,
+                column_order=["product_id", "name", "price", "units_sold", "revenue"],
+                column_config={"price": MONEY, "revenue": MONEY},
+                hide_index=True,
+                height=300,
+            )
         with c2:
             st.metric("Top product", tp_df.iloc[0]["name"])
             st.metric("Top revenue", f"${tp_df.iloc[0]['revenue']:.2f}")
         st.download_button("Export top products CSV", data=df_to_csv_bytes(tp_df), file_name="top_products.csv")
 
-# update insights now that top_products loaded
-st.write("")  # small spacer
-insights = generate_kpi_insights(overview, top_products)
-for line in insights:
-    st.write("• " + line)
-
 st.markdown("---")
 
 # ---------- Customer Insights ----------
 st.subheader("Customer Insights")
-ci = fetch_json("/customer-insights")
+ci = data["customer_insights"]
 if "__error__" in ci:
     st.error(f"API error - /customer-insights: {ci['__error__']}")
 else:
-    top_customers = pd.DataFrame(ci.get("top_customers", []))
+    top_customers = pd.DataFrame.from_records(ci.get("top_customers", []))
     new_vs_repeat = ci.get("new_vs_repeat", {"new_customers": 0, "repeat_customers": 0, "pct_repeat": 0})
     st.metric("New customers (30d)", new_vs_repeat.get("new_customers", 0))
     st.metric("Repeat customers (30d)", new_vs_repeat.get("repeat_customers", 0))
     st.metric("Pct repeat (30d)", f"{new_vs_repeat.get('pct_repeat', 0)}%")
     if not top_customers.empty:
         st.write("Top Customers (by lifetime revenue)")
-        top_customers["lifetime_revenue"] = top_customers["lifetime_revenue"].astype(float)
-        st.dataframe(top_customers[["user_id", "email", "lifetime_revenue", "total_orders"]], height=300)
+        top_customers = top_customers.astype(TOP_CUST_DTYPES)
+        st.dataframe(
+            top_customers,
+            column_order=["user_id", "email", "lifetime_revenue", "total_orders"],
+            column_config={"lifetime_revenue": MONEY},
+            hide_index=True,
+            height=300,
+        )
         st.download_button("Export top customers CSV", data=df_to_csv_bytes(top_customers), file_name="top_customers.csv")
 
 st.markdown("---")
 
 # ---------- Recent Reviews & Sentiment ----------
 st.subheader("Recent Reviews & Sentiment")
-reviews_params = {"limit": 200, "min_rating": 0}
-reviews = fetch_json("/reviews", params=reviews_params)
+reviews = data["reviews"]
 if "__error__" in reviews:
     st.error(f"API error - /reviews: {reviews['__error__']}")
 else:
-    reviews_df = pd.DataFrame(reviews)
+    reviews_df = pd.DataFrame.from_records(reviews)
     if reviews_df.empty:
         st.info("No reviews available.")
     else:
-        reviews_df["rating"] = reviews_df["rating"].astype("Int64")
-        ordering = {"negative": 0, "neutral": 1, "positive": 2}
-        reviews_df["sent_order"] = reviews_df["sentiment"].map(ordering).fillna(3)
-        reviews_df = reviews_df.sort_values(["sent_order", "review_date"], ascending=[True, False])
-        display_df = reviews_df[["review_date", "product_id", "user_id", "rating", "sentiment", "review_text"]]
-        st.dataframe(display_df, height=360)
-        st.download_button("Export reviews CSV", data=df_to_csv_bytes(reviews_df.drop(columns=["sent_order"])), file_name="recent_reviews.csv")
+        reviews_df = reviews_df.astype(REVIEWS_DTYPES)
+        # negative -> positive, unknown values last; the sort key is temporary,
+        # so the sentiment column (shown and exported) keeps its raw values
+        reviews_df = reviews_df.sort_values(
+            ["sentiment", "review_date"],
+            ascending=[True, False],
+            key=sentiment_sort_key,
+        )
+        st.dataframe(
+            reviews_df,
+            column_order=["review_date", "product_id", "user_id", "rating", "sentiment", "review_text"],
+            hide_index=True,
+            height=360,
+        )
+        st.download_button("Export reviews CSV", data=df_to_csv_bytes(reviews_df), file_name="recent_reviews.csv")
 
 st.markdown("---")
 st.caption("Tip: Use date-range for custom trend analysis. Reviews use a lightweight heuristic for sentiment; for production use an LLM or embeddings for more accuracy.")
@@ -325,94 +537,109 @@ st.markdown("---")
 
 # ---------- Product Recommendations ----------
 st.subheader("Product Recommendations")
-prod_list = fetch_json("/products-list")
+prod_list = data["products_list"]
 if "__error__" in prod_list or not prod_list:
     st.info("Product list unavailable for recommendations.")
 else:
-    prod_df = pd.DataFrame(prod_list)
-    prod_options = prod_df.apply(lambda r: f"{r['product_id']} — {r['name']}", axis=1).tolist()
+    prod_df = pd.DataFrame.from_records(prod_list)
+    ids = prod_df["product_id"].to_numpy()
+    names = prod_df["name"].to_numpy()
+    prod_options = [f"{i} — {n}" for i, n in zip(ids, names)]
+    prod_lookup = dict(zip(prod_options, ids.tolist()))
     selected = st.selectbox("Pick a product to get recommendations", prod_options, key="rec_prod_select")
     if selected:
-        selected_product_id = int(selected.split(" — ")[0])
+        selected_product_id = prod_lookup[selected]
         method = st.radio("Method", ["co-purchase", "category"], key="rec_method")
         recs = fetch_json("/recommendations", params={"product_id": selected_product_id, "limit": 10, "method": method})
         if "__error__" in recs:
             st.error(f"API error - /recommendations: {recs['__error__']}")
         else:
-            rec_df = pd.DataFrame(recs)
+            rec_df = pd.DataFrame.from_records(recs)
             if rec_df.empty:
                 st.info("No recommendations found for this product.")
             else:
                 if method == "co-purchase":
                     st.write("Top co-purchased items (support = proportion of orders containing base product):")
-                    if "support" in rec_df:
-                        rec_df["support_percent"] = rec_df["support"].apply(lambda x: f"{x*100:.2f}%")
-                    st.dataframe(rec_df[["product_id", "name", "co_count", "co_revenue", "support"]], height=300)
+                    st.dataframe(
+                        rec_df,
+                        column_order=["product_id", "name", "co_count", "co_revenue", "support"],
+                        column_config={"co_revenue": MONEY, "support": PERCENT},
+                        hide_index=True,
+                        height=300,
+                    )
                 else:
                     st.write("Top items in same category (by revenue):")
-                    st.dataframe(rec_df[["product_id", "name", "revenue"]], height=300)
+                    st.dataframe(
+                        rec_df,
+                        column_order=["product_id", "name", "revenue"],
+                        column_config={"revenue": MONEY},
+                        hide_index=True,
+                        height=300,
+                    )
                 st.download_button("Export recommendations CSV", data=df_to_csv_bytes(rec_df), file_name="recommendations.csv")
 
 st.markdown("---")
 
 # ---------- Anomaly Detection Panel ----------
-st.header("Revenue Anomaly Detection")
-col1, col2, col3 = st.columns([2,1,1])
-with col1:
-    days_back = st.selectbox("Lookback window", [30, 60, 90, 180], index=2, key="anom_days")
-    start_date_anom = st.date_input("Start date", value=date.today() - timedelta(days=days_back-1), key="anom_start")
-    end_date_anom = st.date_input("End date", value=date.today(), key="anom_end")
-with col2:
-    method = st.selectbox("Method", ["zscore", "iqr"], key="anom_method")
-    if method == "zscore":
-        threshold = st.number_input("Z-threshold", min_value=0.5, value=3.0, step=0.5, key="anom_threshold")
-    else:
-        threshold = st.number_input("IQR multiplier", min_value=0.5, value=1.5, step=0.1, key="anom_threshold_iqr")
-with col3:
-    window = st.slider("Rolling window (days)", min_value=3, max_value=30, value=7, key="anom_window")
-
-if st.button("Detect anomalies", key="anom_detect"):
-    params = {
-        "method": method,
-        "window": window,
-        "threshold": threshold,
-        "start_date": start_date_anom.isoformat(),
-        "end_date": end_date_anom.isoformat()
-    }
-    with st.spinner("Fetching data..."):
-        r = requests.get(f"{API_BASE}/anomalies/detect", params=params)
-    if r.status_code != 200:
-        st.error(f"Error: {r.status_code} - {r.text}")
-    else:
-        data = r.json()
-        series = pd.DataFrame(data.get("series", []))
-        if not series.empty:
-            series["day"] = pd.to_datetime(series["day"])
-        anomalies = pd.DataFrame(data.get("anomalies", []))
-        if not anomalies.empty:
-            anomalies["day"] = pd.to_datetime(anomalies["day"])
-
-        base = alt.Chart(series).mark_line().encode(
-            x=alt.X('day:T', title='Date'),
-            y=alt.Y('revenue:Q', title='Revenue')
-        )
-
-        points = alt.Chart(series).mark_circle(size=30).encode(
-            x='day:T',
-            y='revenue:Q',
-            tooltip=['day:T', 'revenue:Q']
-        )
-
-        if not anomalies.empty:
-            anom_points = alt.Chart(anomalies).mark_point(color='red', filled=True, size=100).encode(
-                x='day:T',
-                y='revenue:Q',
-                tooltip=['day:T', alt.Tooltip('revenue:Q', title='Revenue'), alt.Tooltip('score:Q', title='Score'), alt.Tooltip('reason:N', title='Reason')]
-            )
-            st.altair_chart((base + points + anom_points).interactive(), width="stretch")
-            st.markdown("### Detected anomalies")
-            for _, row in anomalies.sort_values('day', ascending=False).iterrows():
-                st.write(f"- **{row['day'].date()}** — revenue: {row['revenue']:.2f}, score: {row['score']:.2f} — {row['reason']}")
+# Widgets inside a fragment rerun only the fragment, so tuning the detector
+# does not refetch the KPI sections above.
+@st.fragment
+def anomaly_panel():
+    st.header("Revenue Anomaly Detection")
+    col1, col2, col3 = st.columns([2,1,1])
+    with col1:
+        days_back = st.selectbox("Lookback window", [30, 60, 90, 180], index=2, key="anom_days")
+        start_date_anom = st.date_input("Start date", value=date.today() - timedelta(days=days_back-1), key="anom_start")
+        end_date_anom = st.date_input("End date", value=date.today(), key="anom_end")
+    with col2:
+        method = st.selectbox("Method", ["zscore", "iqr"], key="anom_method")
+        if method == "zscore":
+            threshold = st.number_input("Z-threshold", min_value=0.5, value=3.0, step=0.5, key="anom_threshold")
+        else:
+            threshold = st.number_input("IQR multiplier", min_value=0.5, value=1.5, step=0.1, key="anom_threshold_iqr")
+    with col3:
+        window = st.slider("Rolling window (days)", min_value=3, max_value=30, value=7, key="anom_window")
+
+    if st.button("Detect anomalies", key="anom_detect"):
+        params = {
+            "method": method,
+            "window": window,
+            "threshold": threshold,
+            "start_date": start_date_anom.isoformat(),
+            "end_date": end_date_anom.isoformat()
+        }
+        with st.spinner("Fetching data..."):
+            r = _http().get("/anomalies/detect", params=params)
+        if r.status_code != 200:
+            st.error(f"Error: {r.status_code} - {r.text}")
         else:
-            st.altair_chart((base + points).interactive(), width="stretch")
-            st.success("No anomalies detected for the chosen parameters.")
+            data = orjson.loads(r.content)
+            series = pd.DataFrame.from_records(data.get("series", []))
+            if not series.empty:
+                series["day"] = pd.to_datetime(series["day"], cache=True, format="ISO8601")
+            anomalies = pd.DataFrame.from_records(data.get("anomalies", []))
+            if not anomalies.empty:
+                anomalies["day"] = pd.to_datetime(anomalies["day"], cache=True, format="ISO8601")
+
+            series_chart = alt.Chart(series).encode(
+                x=alt.X('day:T', title='Date'),
+                y=alt.Y('revenue:Q', title='Revenue')
+            )
+            base = series_chart.mark_line()
+            points = series_chart.mark_circle(size=30).encode(tooltip=['day:T', 'revenue:Q'])
+
+            if not anomalies.empty:
+                anom_points = alt.Chart(anomalies).mark_point(color='red', filled=True, size=100).encode(
+                    x='day:T',
+                    y='revenue:Q',
+                    tooltip=['day:T', alt.Tooltip('revenue:Q', title='Revenue'), alt.Tooltip('score:Q', title='Score'), alt.Tooltip('reason:N', title='Reason')]
+                )
+                st.altair_chart(alt.layer(base, points, anom_points).interactive(), width="stretch")
+                st.markdown("### Detected anomalies")
+                for _, row in anomalies.sort_values('day', ascending=False).iterrows():
+                    st.write(f"- **{row['day'].date()}** — revenue: {row['revenue']:.2f}, score: {row['score']:.2f} — {row['reason']}")
+            else:
+                st.altair_chart(alt.layer(base, points).interactive(), width="stretch")
+                st.success("No anomalies detected for the chosen parameters.")
+
+anomaly_panel()
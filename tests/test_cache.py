@@ -0,0 +1,87 @@
+import asyncio
+import importlib
+import types
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@pytest.fixture
+def clock():
+    return types.SimpleNamespace(now=1000.0)
+
+
+@pytest.fixture
+def cache(backend_env, monkeypatch, clock):
+    module = importlib.import_module("backend.cache")
+    monkeypatch.setattr(module, "redis_client", None)
+    monkeypatch.setattr(module, "_store", type(module._store)())
+    monkeypatch.setattr(module, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return module
+
+
+def counting(cache, ttl=60):
+    calls = []
+
+    @cache.cached("test:endpoint", ttl=ttl)
+    async def handler(**kwargs):
+        calls.append(kwargs)
+        return {"n": len(calls)}
+
+    return handler, calls
+
+
+def test_key_ignores_sessions(cache):
+    session = AsyncSession()
+    key = cache._make_key("kpi:x", {"months": 12, "db": session})
+    assert key == cache._make_key("kpi:x", {"months": 12})
+    assert key.startswith(f"{cache.CACHE_NAMESPACE}:kpi:x:")
+    assert key != cache._make_key("kpi:x", {"months": 6})
+    assert key != cache._make_key("kpi:y", {"months": 12})
+
+
+def test_same_params_hit_cache(cache):
+    handler, calls = counting(cache)
+    assert asyncio.run(handler(months=12, db=AsyncSession())) == {"n": 1}
+    assert asyncio.run(handler(months=12, db=AsyncSession())) == {"n": 1}
+    assert asyncio.run(handler(months=6)) == {"n": 2}
+    assert len(calls) == 2
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    handler, calls = counting(cache, ttl=60)
+    asyncio.run(handler(months=12))
+    clock.now += 59
+    asyncio.run(handler(months=12))
+    assert len(calls) == 1
+    clock.now += 1
+    asyncio.run(handler(months=12))
+    assert len(calls) == 2
+
+
+def test_store_is_bounded_lru(cache, monkeypatch):
+    monkeypatch.setattr(cache, "_MAX_ENTRIES", 3)
+    handler, calls = counting(cache)
+    for i in range(3):
+        asyncio.run(handler(i=i))
+    asyncio.run(handler(i=0))  # refresh i=0 so i=1 is the oldest
+    asyncio.run(handler(i=3))
+    assert len(cache._store) == 3
+    assert cache._make_key("test:endpoint", {"i": 1}) not in cache._store
+
+    asyncio.run(handler(i=0))
+    assert len(calls) == 4
+
+
+def test_expired_entries_are_evicted_first(cache, clock, monkeypatch):
+    monkeypatch.setattr(cache, "_MAX_ENTRIES", 2)
+    short, _ = counting(cache, ttl=10)
+    long, _ = counting(cache, ttl=60)
+    asyncio.run(long(i=0))
+    asyncio.run(short(i=1))
+    clock.now += 30
+    asyncio.run(long(i=2))
+    assert list(cache._store) == [
+        cache._make_key("test:endpoint", {"i": 0}),
+        cache._make_key("test:endpoint", {"i": 2}),
+    ]
@@ -0,0 +1,43 @@
+from backend.config import get_settings, to_async_url
+
+
+def test_settings_default_origins(backend_env, monkeypatch):
+    monkeypatch.delenv("FRONTEND_ORIGINS", raising=False)
+    assert get_settings().cors_origins == (
+        "http://localhost:8501",
+        "http://127.0.0.1:8501",
+    )
+
+
+def test_settings_parse_origins(backend_env, monkeypatch):
+    monkeypatch.setenv("FRONTEND_ORIGINS", " https://a.example , ,https://b.example,")
+    assert get_settings().cors_origins == ("https://a.example", "https://b.example")
+
+
+def test_settings_read_once(backend_env, monkeypatch):
+    first = get_settings()
+    monkeypatch.setenv("DATABASE_URL", "postgresql://other/db")
+    assert get_settings() is first
+    get_settings.cache_clear()
+    assert get_settings().database_url == "postgresql://other/db"
+
+
+def test_settings_flags(backend_env, monkeypatch):
+    monkeypatch.setenv("DEV_RELOAD", "1")
+    monkeypatch.delenv("DEBUG_ROUTES", raising=False)
+    settings = get_settings()
+    assert settings.dev_reload is True
+    assert settings.debug_routes is False
+    assert settings.redis_url is None
+
+
+def test_async_url_rewrites_scheme():
+    assert to_async_url("postgres://u:p@h:5432/db") == ("postgresql+asyncpg://u:p@h:5432/db", None)
+    assert to_async_url("postgresql://u:p@h/db") == ("postgresql+asyncpg://u:p@h/db", None)
+    assert to_async_url("postgresql+asyncpg://u:p@h/db") == ("postgresql+asyncpg://u:p@h/db", None)
+
+
+def test_async_url_splits_sslmode():
+    url, ssl_mode = to_async_url("postgresql://u:p%40ss@h/db?sslmode=require&application_name=x")
+    assert ssl_mode == "require"
+    assert url == "postgresql+asyncpg://u:p%40ss@h/db?application_name=x"
@@ -0,0 +1,53 @@
+import importlib
+import ssl
+
+import pytest
+
+
+@pytest.fixture
+def db(backend_env):
+    return importlib.import_module("backend.db")
+
+
+def test_ssl_arg_plain_modes(db):
+    assert db._ssl_arg(None) is None
+    assert db._ssl_arg("disable") is False
+    assert db._ssl_arg("allow") == "allow"
+    assert db._ssl_arg("prefer") == "prefer"
+
+
+def test_ssl_arg_require_does_not_verify(db):
+    ctx = db._ssl_arg("require")
+    assert isinstance(ctx, ssl.SSLContext)
+    assert ctx.verify_mode == ssl.CERT_NONE
+    assert db._ssl_arg("require") is ctx
+
+
+def test_ssl_arg_verify_modes(db):
+    assert db._ssl_arg("verify-ca").check_hostname is False
+    full = db._ssl_arg("verify-full")
+    assert full.check_hostname is True
+    assert full.verify_mode == ssl.CERT_REQUIRED
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("postgresql+asyncpg://u:p@localhost/db", False),
+    ("postgresql+asyncpg://u:p@127.0.0.1/db", False),
+    ("postgresql+asyncpg://u:p@db.example.com/db", None),
+])
+def test_loopback_without_sslmode_disables_tls(db, monkeypatch, url, expected):
+    assert _connect_ssl(db, monkeypatch, url, None) is expected
+
+
+def test_explicit_sslmode_is_honoured_on_loopback(db, monkeypatch):
+    ctx = _connect_ssl(db, monkeypatch, "postgresql+asyncpg://u:p@localhost:6543/db", "require")
+    assert isinstance(ctx, ssl.SSLContext)
+
+
+def _connect_ssl(db, monkeypatch, url, ssl_mode):
+    """The ssl= argument _build_engine would hand asyncpg (None: omitted)."""
+    seen = {}
+    monkeypatch.setattr(db, "_database_url", lambda: (url, ssl_mode))
+    monkeypatch.setattr(db, "create_async_engine", lambda url, **kw: seen.update(kw))
+    db._build_engine.__wrapped__()
+    return seen["connect_args"].get("ssl")
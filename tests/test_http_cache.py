@@ -0,0 +1,103 @@
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def main(backend_env, monkeypatch):
+    kpi = importlib.import_module("backend.api.kpi")
+    cache = importlib.import_module("backend.cache")
+
+    async def fake_fetch_all(sql, params=None):
+        return [{"category": "Apparel"}, {"category": "Shoes"}]
+
+    monkeypatch.setattr(kpi, "_fetch_all", fake_fetch_all)
+    monkeypatch.setattr(cache, "_store", type(cache._store)())
+    return importlib.import_module("backend.main")
+
+
+@pytest.fixture
+def client(main):
+    # No lifespan: the stubbed handlers never reach the database
+    return TestClient(main.app)
+
+
+def test_kpi_get_has_etag(client):
+    resp = client.get("/kpi/categories")
+    assert resp.status_code == 200
+    assert resp.json() == ["Apparel", "Shoes"]
+    assert resp.headers["etag"].startswith('W/"')
+    assert resp.headers["cache-control"] == "public, max-age=3600"
+
+
+def test_max_age_follows_cached_ttl(client, main, monkeypatch):
+    kpi = importlib.import_module("backend.api.kpi")
+
+    async def fake_fetch_one(sql, params=None):
+        return {}
+
+    monkeypatch.setattr(kpi, "_fetch_one", fake_fetch_one)
+    monkeypatch.setattr(kpi.kpi_overview, "cache_ttl", 30)
+    resp = client.get("/kpi/overview")
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"] == "public, max-age=30"
+
+
+@pytest.mark.parametrize("header", [
+    "{etag}",
+    "{strong}",
+    '"other", {etag}',
+    "*",
+])
+def test_matching_if_none_match_is_304(client, header):
+    etag = client.get("/kpi/categories").headers["etag"]
+    header = header.format(etag=etag, strong=etag.removeprefix("W/"))
+    resp = client.get("/kpi/categories", headers={"If-None-Match": header})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+    assert "content-length" not in resp.headers
+
+
+def test_partial_etag_is_not_a_match(client):
+    etag = client.get("/kpi/categories").headers["etag"]
+    resp = client.get("/kpi/categories", headers={"If-None-Match": etag[:-3] + '"'})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] == etag
+
+
+def test_no_etag_outside_kpi_gets(client, main, monkeypatch):
+    kpi = importlib.import_module("backend.api.kpi")
+
+    async def fake_fetch_all(sql, params=None):
+        return []
+
+    monkeypatch.setattr(kpi, "_fetch_all", fake_fetch_all)
+    post = client.post("/kpi/recommendations/batch", json=[1])
+    assert post.status_code == 200
+    assert "etag" not in post.headers
+
+    root = client.get("/")
+    assert root.status_code == 200
+    assert "etag" not in root.headers
+
+
+def test_repeated_headers_survive(main):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"set-cookie", b"a=1"),
+                (b"set-cookie", b"b=2"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b"[1,", "more_body": True})
+        await send({"type": "http.response.body", "body": b"2]"})
+
+    resp = TestClient(main.HTTPCacheMiddleware(app)).get("/kpi/x")
+    assert resp.content == b"[1,2]"
+    assert resp.headers.get_list("set-cookie") == ["a=1", "b=2"]
+    assert resp.headers["etag"] == main._etag(b"[1,2]")
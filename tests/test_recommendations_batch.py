@@ -0,0 +1,67 @@
+import importlib
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def kpi(backend_env):
+    return importlib.import_module("backend.api.kpi")
+
+
+@pytest.fixture
+def client(kpi):
+    # No lifespan: these tests never reach the database
+    return TestClient(importlib.import_module("backend.main").app)
+
+
+@pytest.fixture
+def fetched(kpi, monkeypatch):
+    calls = []
+
+    async def fake_fetch_all(sql, params=None):
+        calls.append((sql, params))
+        return []
+
+    monkeypatch.setattr(kpi, "_fetch_all", fake_fetch_all)
+    return calls
+
+
+def test_batch_rejects_empty_list(client, fetched):
+    assert client.post("/kpi/recommendations/batch", json=[]).status_code == 422
+    assert fetched == []
+
+
+def test_batch_rejects_too_many_products(client, kpi, fetched):
+    ids = list(range(kpi._BATCH_MAX_PRODUCTS + 1))
+    assert client.post("/kpi/recommendations/batch", json=ids).status_code == 422
+    assert fetched == []
+
+
+def test_batch_dedupes_products(client, kpi, fetched):
+    resp = client.post("/kpi/recommendations/batch?limit=3", json=[5, 2, 5])
+    assert resp.status_code == 200
+    assert fetched == [(kpi._SQL_RECOMMENDATIONS_BATCH, {"product_ids": [2, 5], "limit": 3})]
+
+
+@pytest.mark.skipif(
+    not os.getenv("TEST_DATABASE_URL"),
+    reason="needs TEST_DATABASE_URL pointing at a loaded ecom database",
+)
+def test_batch_matches_single_endpoint(backend_env):
+    app = importlib.import_module("backend.main").app
+    limit = 3
+    with TestClient(app) as client:
+        ids = [p["product_id"] for p in client.get("/kpi/products-list?limit=5").json()]
+        batch = client.post(f"/kpi/recommendations/batch?limit={limit}", json=ids).json()
+
+        for pid in ids:
+            rows = [
+                {k: v for k, v in r.items() if k != "source_product_id"}
+                for r in batch
+                if r["source_product_id"] == pid
+            ]
+            assert len(rows) <= limit
+            single = client.get(f"/kpi/recommendations?product_id={pid}&limit={limit}").json()
+            assert rows == single
@@ -0,0 +1,5 @@
+import importlib
+
+
+def test_router_exists(backend_env):
+    assert hasattr(importlib.import_module("backend.api.anomalies"), "router")